@@ -0,0 +1,24 @@
+# eval_utils.py
+"""
+答案评估共用的文本标准化工具
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+
+# 预编译的非单词字符正则
+_NONWORD_RE = re.compile(r'\W+')
+
+
+# 缓存最近标准化过的字符串，同一答案/参考答案反复比较时只标准化一次；
+# 限制大小以免长时间运行的进程（如notebook）无限增长
+@lru_cache(maxsize=65536)
+def normalize_answer(text):
+    """
+    标准化文本：NFKC规范化、小写并按非单词字符切分（结果会被缓存）
+    
+    注意：NFKC会折叠兼容字符（如全角字母、连字ﬁ→fi、上标²→2），
+    这对评估中的token比较是合适的，但不适合需要保留原字形的场景
+    """
+    return tuple(_NONWORD_RE.sub(' ', unicodedata.normalize('NFKC', text).lower()).split())
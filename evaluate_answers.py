@@ -4,35 +4,86 @@
 """
 
 from qasper_utils import QasperDataProcessor
-import re
+from eval_utils import normalize_answer
+
+import numpy as np
+from scipy import sparse
+
 
 def compute_token_f1(prediction, reference):
     """计算Token-level F1分数"""
     
-    # 标准化
-    def normalize(text):
-        text = text.lower()
-        text = re.sub(r'\W+', ' ', text)
-        return text.split()
+    pred_tokens = frozenset(normalize_answer(prediction))
+    ref_tokens = frozenset(normalize_answer(reference))
     
-    pred_tokens = set(normalize(prediction))
-    ref_tokens = set(normalize(reference))
+    # F1 = 2PR/(P+R) = 2|∩| / (|pred| + |ref|)
+    inter = len(pred_tokens & ref_tokens)
     
-    if not pred_tokens or not ref_tokens:
+    if inter == 0:
         return 0.0
     
-    # 计算交集
-    common = pred_tokens & ref_tokens
-    
-    if not common:
-        return 0.0
-    
-    precision = len(common) / len(pred_tokens)
-    recall = len(common) / len(ref_tokens)
-    
-    f1 = 2 * (precision * recall) / (precision + recall)
-    
-    return f1
+    return 2 * inter / (len(pred_tokens) + len(ref_tokens))
+
+
+def _token_csr_parts(texts, vocab):
+    """将文本列表转换为二值CSR矩阵的 (data, indices, indptr)，每个唯一token记1"""
+    indptr = [0]
+    indices = []
+    for text in texts:
+        ids = np.fromiter(
+            (vocab.setdefault(tok, len(vocab)) for tok in normalize_answer(text)),
+            dtype=np.int32,
+        )
+        ids = np.unique(ids)
+        indices.append(ids)
+        indptr.append(indptr[-1] + len(ids))
+    
+    indices = np.concatenate(indices) if indices else np.empty(0, dtype=np.int32)
+    data = np.ones(len(indices), dtype=np.int32)
+    return data, indices, indptr
+
+
+def best_token_f1(predictions, references):
+    """
+    批量计算每个答案与其自身参考答案的最佳Token-level F1
+    
+    references[i] 是 predictions[i] 的参考答案列表。只对 (答案, 自身参考答案) 对计算，
+    返回 (max_f1, best_idx)：best_idx[i] 为最佳参考答案在 references[i] 中的下标，
+    没有参考答案或F1全为0时为 -1
+    """
+    n = len(predictions)
+    counts = np.array([len(refs) for refs in references], dtype=np.int64)
+    ref_owner = np.repeat(np.arange(n), counts)
+    all_refs = [ref for refs in references for ref in refs]
+    
+    vocab = {}
+    pred_parts = _token_csr_parts(predictions, vocab)
+    ref_parts = _token_csr_parts(all_refs, vocab)
+    
+    P = sparse.csr_matrix(pred_parts, shape=(n, len(vocab)))
+    R = sparse.csr_matrix(ref_parts, shape=(len(all_refs), len(vocab)))
+    
+    # 逐对计算交集大小；F1 = 2|∩| / (|P| + |R|)
+    inter = np.asarray(P[ref_owner].multiply(R).sum(axis=1), dtype=np.float64).ravel()
+    p_sizes = np.asarray(P.sum(axis=1)).ravel()
+    r_sizes = np.asarray(R.sum(axis=1)).ravel()
+    
+    f1 = np.zeros_like(inter)
+    np.divide(2 * inter, p_sizes[ref_owner] + r_sizes, out=f1, where=inter > 0)
+    
+    # 按问题、F1降序、原始顺序排序；排序后各组仍从原偏移量开始，
+    # 每组第一个即最佳（并列时取靠前的参考答案）
+    order = np.lexsort((np.arange(len(all_refs)), -f1, ref_owner))
+    offsets = np.cumsum(counts) - counts
+    has_refs = counts > 0
+    best_pos = order[offsets[has_refs]]
+    
+    max_f1 = np.zeros(n, dtype=np.float64)
+    best_idx = np.full(n, -1, dtype=np.int64)
+    max_f1[has_refs] = f1[best_pos]
+    best_idx[has_refs] = np.where(f1[best_pos] > 0, best_pos - offsets[has_refs], -1)
+    
+    return max_f1, best_idx
 
 
 def evaluate_first_experiment():
@@ -68,21 +119,21 @@ def evaluate_first_experiment():
     # 评估每个答案
     print("\n评估结果:\n")
     
+    # 一次性计算所有答案与各自参考答案的最佳F1
+    max_f1s, best_idx = best_token_f1(
+        [result['raptor_answer'] for result in results],
+        [result['references'] for result in results],
+    )
+    
     total_f1 = 0
     
-    for i, result in enumerate(results, 1):
+    for i, result in enumerate(results):
         print(f"{'─'*80}")
-        print(f"问题 {i}: {result['question']}\n")
-        
-        # 计算与所有参考答案的F1，取最大值
-        max_f1 = 0
-        best_ref = ""
+        print(f"问题 {i + 1}: {result['question']}\n")
         
-        for ref in result['references']:
-            f1 = compute_token_f1(result['raptor_answer'], ref)
-            if f1 > max_f1:
-                max_f1 = f1
-                best_ref = ref
+        # 取与所有参考答案F1的最大值
+        max_f1 = float(max_f1s[i])
+        best_ref = result['references'][best_idx[i]] if best_idx[i] >= 0 else ""
         
         total_f1 += max_f1
         
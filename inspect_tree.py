@@ -3,18 +3,71 @@
 详细检查和可视化RAPTOR树结构
 """
 
+import mmap
+import os
 import pickle
 import json
-from pathlib import Path
+import weakref
+from functools import lru_cache
 from collections import defaultdict
 
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 def load_tree(tree_path):
-    """加载树文件"""
+    """加载树文件（按路径和修改时间缓存）"""
+    tree_path = os.path.abspath(tree_path)
+    return _load_tree_cached(tree_path, os.path.getmtime(tree_path))
+
+
+@lru_cache(maxsize=4)
+def _load_tree_cached(tree_path, mtime):
+    """通过mmap读取树文件，避免额外的用户态拷贝"""
     with open(tree_path, 'rb') as f:
-        tree = pickle.load(f)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            tree = pickle.loads(mm)
     return tree
 
 
+# 每棵树的逐层统计缓存（树被回收时自动失效）
+_tree_summaries = weakref.WeakKeyDictionary()
+
+
+def _summarize_tree(tree):
+    """
+    一次遍历所有节点，按层收集节点索引、文本长度和子节点数（SoA布局）
+    
+    返回 {layer_idx: {'indices', 'text_lens', 'num_children'}}，值均为numpy数组
+    """
+    summary = _tree_summaries.get(tree)
+    if summary is not None:
+        return summary
+    
+    summary = {}
+    for layer_idx, nodes in tree.layer_to_nodes.items():
+        indices = np.empty(len(nodes), dtype=np.int64)
+        text_lens = np.empty(len(nodes), dtype=np.int32)
+        num_children = np.empty(len(nodes), dtype=np.int32)
+        
+        for i, node in enumerate(nodes):
+            indices[i] = node.index
+            text_lens[i] = len(node.text)
+            num_children[i] = len(node.children)
+        
+        summary[layer_idx] = {
+            'indices': indices,
+            'text_lens': text_lens,
+            'num_children': num_children,
+        }
+    
+    _tree_summaries[tree] = summary
+    return summary
+
+
 def analyze_tree_structure(tree):
     """分析树的结构"""
     
@@ -29,32 +82,31 @@ def analyze_tree_structure(tree):
     print(f"  叶子节点数: {len(tree.leaf_nodes)}")
     print(f"  根节点数: {len(tree.root_nodes)}")
     
+    summary = _summarize_tree(tree)
+    
     # 2. 各层分布
     print("\n【2. 各层节点分布】")
-    for layer_idx, nodes in tree.layer_to_nodes.items():
-        print(f"  Layer {layer_idx}: {len(nodes)} 个节点")
+    for layer_idx, stats in summary.items():
+        text_lens = stats['text_lens']
+        print(f"  Layer {layer_idx}: {len(text_lens)} 个节点")
         
         # 计算该层的总文本量
-        total_chars = sum(len(node.text) for node in nodes)
-        avg_chars = total_chars / len(nodes) if nodes else 0
+        total_chars = int(text_lens.sum())
+        avg_chars = text_lens.mean() if text_lens.size else 0
         print(f"    - 总字符数: {total_chars:,}")
         print(f"    - 平均字符数: {avg_chars:.0f}")
     
     # 3. 树的形状
     print("\n【3. 树的形状（父子关系）】")
     for layer_idx in range(tree.num_layers):
-        if layer_idx in tree.layer_to_nodes:
-            current_layer = tree.layer_to_nodes[layer_idx]
-            
-            children_counts = []
-            for node in current_layer:
-                children_counts.append(len(node.children))
+        if layer_idx in summary:
+            children_counts = summary[layer_idx]['num_children']
             
-            if children_counts:
-                avg_children = sum(children_counts) / len(children_counts)
+            if children_counts.size:
+                avg_children = children_counts.mean()
                 print(f"  Layer {layer_idx} → Layer {layer_idx + 1}")
                 print(f"    - 平均子节点数: {avg_children:.1f}")
-                print(f"    - 子节点数范围: {min(children_counts)} - {max(children_counts)}")
+                print(f"    - 子节点数范围: {children_counts.min()} - {children_counts.max()}")
     
     return tree
 
@@ -89,37 +141,54 @@ def show_sample_nodes(tree, num_samples=2):
             print(f"     {node.text}")
 
 
+def _dumps_indented(obj, level):
+    """序列化为缩进2格的JSON（UTF-8字节），并整体缩进到指定层级"""
+    if orjson is not None:
+        data = orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    else:
+        data = json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+    # JSON字符串内的换行已被转义，这里只会替换结构换行
+    return data.replace(b"\n", b"\n" + b"  " * level)
+
+
 def extract_tree_to_json(tree, output_path):
     """将树导出为JSON格式（便于查看）"""
     
-    tree_dict = {
-        'meta': {
-            'total_nodes': len(tree.all_nodes),
-            'num_layers': tree.num_layers + 1,
-            'leaf_nodes': len(tree.leaf_nodes),
-            'root_nodes': len(tree.root_nodes)
-        },
-        'layers': {}
+    meta = {
+        'total_nodes': len(tree.all_nodes),
+        'num_layers': tree.num_layers + 1,
+        'leaf_nodes': len(tree.leaf_nodes),
+        'root_nodes': len(tree.root_nodes)
     }
     
-    # 导出每一层
-    for layer_idx, nodes in tree.layer_to_nodes.items():
-        layer_data = []
-        for node in nodes:
-            node_data = {
-                'index': node.index,
-                'text': node.text,
-                'text_length': len(node.text),
-                'num_children': len(node.children),
-                'children': sorted(list(node.children))
-            }
-            layer_data.append(node_data)
-        
-        tree_dict['layers'][f'layer_{layer_idx}'] = layer_data
+    summary = _summarize_tree(tree)
     
-    # 保存为JSON
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(tree_dict, f, indent=2, ensure_ascii=False)
+    # 逐节点流式写出，不在内存中构建完整的树字典
+    with open(output_path, 'wb') as f:
+        f.write(b'{\n  "meta": ' + _dumps_indented(meta, 1) + b',\n  "layers": {')
+        
+        # 导出每一层
+        for layer_pos, (layer_idx, nodes) in enumerate(tree.layer_to_nodes.items()):
+            text_lens = summary[layer_idx]['text_lens'].tolist()
+            num_children = summary[layer_idx]['num_children'].tolist()
+            
+            f.write(b',\n' if layer_pos else b'\n')
+            f.write(f'    "layer_{layer_idx}": ['.encode('utf-8'))
+            
+            for i, node in enumerate(nodes):
+                node_data = {
+                    'index': node.index,
+                    'text': node.text,
+                    'text_length': text_lens[i],
+                    'num_children': num_children[i],
+                    'children': sorted(list(node.children))
+                }
+                f.write(b',\n      ' if i else b'\n      ')
+                f.write(_dumps_indented(node_data, 3))
+            
+            f.write(b'\n    ]' if nodes else b']')
+        
+        f.write(b'\n  }\n}' if tree.layer_to_nodes else b'}\n}')
     
     print(f"\n✓ 树结构已导出为JSON: {output_path}")
     print(f"  可以用文本编辑器打开查看")
@@ -128,29 +197,36 @@ def extract_tree_to_json(tree, output_path):
 def visualize_tree_graph(tree, output_path='tree_structure.txt'):
     """生成ASCII艺术风格的树结构可视化"""
     
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write("RAPTOR树结构可视化\n")
-        f.write("="*80 + "\n\n")
+    summary = _summarize_tree(tree)
+    
+    # 按层汇总成行列表后一次写出，配合1MB缓冲减少系统调用
+    with open(output_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+        f.write("RAPTOR树结构可视化\n" + "="*80 + "\n\n")
         
         # 从根节点开始
         for layer_idx in range(tree.num_layers, -1, -1):
-            f.write(f"\n{'─'*80}\n")
-            f.write(f"Layer {layer_idx}\n")
-            f.write(f"{'─'*80}\n\n")
+            lines = [
+                f"\n{'─'*80}\n",
+                f"Layer {layer_idx}\n",
+                f"{'─'*80}\n\n",
+            ]
             
             nodes = tree.layer_to_nodes[layer_idx]
+            text_lens = summary[layer_idx]['text_lens'].tolist()
             
             for i, node in enumerate(nodes):
                 # 节点信息
-                f.write(f"Node {node.index}:\n")
-                f.write(f"  文本: {node.text[:100]}...\n")
-                f.write(f"  长度: {len(node.text)} 字符\n")
+                lines.append(f"Node {node.index}:\n")
+                lines.append(f"  文本: {node.text[:100]}...\n")
+                lines.append(f"  长度: {text_lens[i]} 字符\n")
                 
                 # 子节点
                 if node.children:
-                    f.write(f"  子节点: {sorted(list(node.children))}\n")
+                    lines.append(f"  子节点: {sorted(list(node.children))}\n")
                 
-                f.write("\n")
+                lines.append("\n")
+            
+            f.writelines(lines)
     
     print(f"\n✓ 树结构可视化已保存: {output_path}")
 
@@ -159,7 +235,13 @@ def main():
     """主函数"""
     
     # 找到树文件
-    tree_files = list(Path("trees").glob("*.pkl"))
+    tree_files = []
+    if os.path.isdir("trees"):
+        with os.scandir("trees") as it:
+            tree_files = sorted(
+                entry.path for entry in it
+                if entry.name.endswith('.pkl') and entry.is_file()
+            )
     
     if not tree_files:
         print("❌ 未找到树文件")
@@ -1,37 +1,88 @@
 # qasper_utils.py
+import io
 import json
-from typing import Dict, List, Tuple, Optional
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple, Optional, Union
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+@dataclass
+class Paper:
+    """
+    单篇QASPER论文（使用__slots__，比原始字典占用更少内存）
+    """
+    __slots__ = ('id', 'title', 'abstract', 'full_text', 'qas', 'figures_and_tables')
+    
+    id: str
+    title: str
+    abstract: str
+    full_text: List[Dict]
+    qas: List[Dict]
+    figures_and_tables: List[Dict]
+    
+    @classmethod
+    def from_dict(cls, paper_id: str, paper_data: Dict) -> 'Paper':
+        """从原始JSON字典构建论文"""
+        return cls(
+            id=paper_id,
+            title=paper_data.get('title', 'Untitled'),
+            abstract=paper_data.get('abstract', ''),
+            full_text=paper_data.get('full_text', []),
+            qas=paper_data.get('qas', []),
+            figures_and_tables=paper_data.get('figures_and_tables', []),
+        )
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """兼容旧的字典式访问"""
+        return getattr(self, key, default)
+
+
+def _as_paper(paper: Union[Paper, Dict]) -> Paper:
+    """将字典形式的论文转换为Paper（已是Paper则原样返回）"""
+    if isinstance(paper, Paper):
+        return paper
+    return Paper.from_dict(paper.get('id', 'unknown'), paper)
+
+
 class QasperDataProcessor:
     """
     QASPER数据集处理工具（健壮版）
     """
     
-    def __init__(self, data_path: str):
+    def __init__(self, data_path: str, eager: bool = False):
         self.data_path = Path(data_path)
-        self.papers = []
-        self.paper_ids = []
+        self.eager = eager
+        self._index = {}
+        self._papers = None
+        self._paper_ids = None
         self.load_data()
     
     def load_data(self):
-        """加载QASPER数据"""
+        """加载QASPER数据（默认只建立 paper_id -> 论文 的索引，论文列表按需构建）"""
         print(f"加载数据: {self.data_path}")
         
         if not self.data_path.exists():
             raise FileNotFoundError(f"数据文件不存在: {self.data_path}")
         
         try:
-            with open(self.data_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with open(self.data_path, 'rb') as f:
+                # 优先使用orjson解析，未安装时退回标准库json
+                if orjson is not None:
+                    self._index = orjson.loads(f.read())
+                else:
+                    self._index = json.load(f)
             
-            # 将字典转换为列表
-            for paper_id, paper_data in data.items():
-                paper_data['id'] = paper_id
-                self.papers.append(paper_data)
-                self.paper_ids.append(paper_id)
+            self._papers = None
+            self._paper_ids = None
+            if self.eager:
+                self.papers  # 立即构建论文列表
             
-            print(f"✓ 已加载 {len(self.papers)} 篇论文")
+            print(f"✓ 已加载 {self._num_papers()} 篇论文")
             
         except json.JSONDecodeError as e:
             print(f"❌ JSON解析错误: {e}")
@@ -40,30 +91,68 @@ class QasperDataProcessor:
             print(f"❌ 加载数据失败: {e}")
             raise
     
-    def get_paper_text(self, paper: Dict) -> str:
+    @property
+    def paper_ids(self) -> List[str]:
+        """所有论文ID（按文件顺序）"""
+        if self._paper_ids is None:
+            self._paper_ids = list(self._index)
+        return self._paper_ids
+    
+    @property
+    def papers(self) -> List[Paper]:
+        """所有论文（首次访问时构建）"""
+        if self._papers is None:
+            self._papers = [self.get_paper(i) for i in range(len(self.paper_ids))]
+        return self._papers
+    
+    def _num_papers(self) -> int:
+        """论文总数（无需构建论文列表）"""
+        return len(self._papers) if self._papers is not None else len(self._index)
+    
+    def get_paper(self, paper_index: int) -> Paper:
+        """按索引获取单篇论文，无需构建完整的论文列表"""
+        if self._papers is not None:
+            return self._papers[paper_index]
+        
+        paper_id = self.paper_ids[paper_index]
+        paper = self._index[paper_id]
+        
+        # 首次访问时转换为Paper，并替换索引中的原始字典
+        if not isinstance(paper, Paper):
+            paper = Paper.from_dict(paper_id, paper)
+            self._index[paper_id] = paper
+        
+        return paper
+    
+    def get_paper_text(self, paper: Union[Paper, Dict]) -> str:
         """
         提取论文全文（健壮版）
         """
-        full_text_parts = []
+        # 各部分之间以换行分隔，直接写入同一个缓冲区
+        buf = io.StringIO()
         
         try:
+            paper = _as_paper(paper)
+            
             # 添加标题
-            title = paper.get('title', 'Untitled')
+            title = paper.title
             if title:
-                full_text_parts.append(f"# {title}\n")
+                buf.write(f"# {title}\n")
             
             # 添加摘要
-            abstract = paper.get('abstract', '')
+            abstract = paper.abstract
             if abstract:
-                full_text_parts.append(f"## Abstract\n{abstract}\n")
+                if buf.tell():
+                    buf.write("\n")
+                buf.write(f"## Abstract\n{abstract}\n")
             
             # 添加全文
-            full_text_parts.append("## Full Text\n")
+            if buf.tell():
+                buf.write("\n")
+            buf.write("## Full Text\n")
             
             # 处理full_text
-            full_text = paper.get('full_text', [])
-            
-            for section in full_text:
+            for section in paper.full_text:
                 if not isinstance(section, dict):
                     continue
                 
@@ -75,27 +164,73 @@ class QasperDataProcessor:
                 paragraphs = section.get('paragraphs', [])
                 
                 # 添加section名称
-                if section_name and str(section_name).strip():
-                    full_text_parts.append(f"\n### {str(section_name).strip()}\n")
+                if section_name:
+                    section_name = str(section_name).strip()
+                    if section_name:
+                        buf.write(f"\n\n### {section_name}\n")
                 
                 # 添加段落
                 for para in paragraphs:
-                    if para is not None and str(para).strip():
-                        full_text_parts.append(f"{str(para).strip()}\n")
+                    if para is not None:
+                        para = str(para).strip()
+                        if para:
+                            buf.write(f"\n{para}\n")
             
-            return "\n".join(full_text_parts)
+            return buf.getvalue()
             
         except Exception as e:
             print(f"⚠️  提取论文文本时出错 (ID: {paper.get('id', 'unknown')}): {e}")
             # 返回最小可用文本
             return f"# {paper.get('title', 'Error')}\n\n{paper.get('abstract', 'Error loading text')}"
     
-    def get_questions_and_answers(self, paper: Dict) -> List[Tuple[str, List[Dict]]]:
+    def _estimate_text_length(self, paper: Union[Paper, Dict]) -> int:
+        """
+        计算get_paper_text结果的字符数，但不拼接全文
+        
+        与get_paper_text的排版保持一致；遇到异常数据时退回到实际构建文本
+        注意：这里复制了get_paper_text的分隔符排版，修改其中一个时必须同步修改另一个
+        """
+        try:
+            paper = _as_paper(paper)
+            length = 0
+            
+            title = paper.title
+            if title:
+                length += len(f"# {title}\n")
+            
+            abstract = paper.abstract
+            if abstract:
+                length += (1 if length else 0) + len(f"## Abstract\n{abstract}\n")
+            
+            length += (1 if length else 0) + len("## Full Text\n")
+            
+            for section in paper.full_text:
+                if not isinstance(section, dict):
+                    continue
+                
+                section_name = section.get('section_name')
+                if section_name:
+                    section_name = str(section_name).strip()
+                    if section_name:
+                        length += len(section_name) + len("\n\n### \n")
+                
+                for para in section.get('paragraphs', []):
+                    if para is not None:
+                        para = str(para).strip()
+                        if para:
+                            length += len(para) + len("\n\n")
+            
+            return length
+            
+        except Exception:
+            return len(self.get_paper_text(paper))
+    
+    def get_questions_and_answers(self, paper: Union[Paper, Dict]) -> List[Tuple[str, List[Dict]]]:
         """提取问题和答案"""
         qa_pairs = []
         
         try:
-            qas = paper.get('qas', [])
+            qas = _as_paper(paper).qas
             
             for qa in qas:
                 if not isinstance(qa, dict):
@@ -128,7 +263,8 @@ class QasperDataProcessor:
             if 'extractive_spans' in answer and answer['extractive_spans']:
                 spans = answer['extractive_spans']
                 if isinstance(spans, list):
-                    return ' '.join(str(s) for s in spans if s)
+                    # QASPER的span通常已是str，只对非str元素调用str()
+                    return ' '.join(s if isinstance(s, str) else str(s) for s in spans if s)
             
             # 3. 是非题
             if 'yes_no' in answer:
@@ -148,10 +284,10 @@ class QasperDataProcessor:
         """
         为RAPTOR准备数据（健壮版）
         """
-        if paper_index < 0 or paper_index >= len(self.papers):
-            raise IndexError(f"论文索引超出范围: {paper_index} (总数: {len(self.papers)})")
+        if paper_index < 0 or paper_index >= self._num_papers():
+            raise IndexError(f"论文索引超出范围: {paper_index} (总数: {self._num_papers()})")
         
-        paper = self.papers[paper_index]
+        paper = self.get_paper(paper_index)
         
         # 获取论文文本
         text = self.get_paper_text(paper)
@@ -162,53 +298,79 @@ class QasperDataProcessor:
         # 处理答案文本
         processed_qa_pairs = []
         for question, answers in raw_qa_pairs:
-            answer_texts = []
-            
-            for ans in answers:
-                if not isinstance(ans, dict):
-                    continue
-                
-                ans_text = self.extract_answer_text(ans)
-                if ans_text and ans_text != 'Unanswerable':
-                    answer_texts.append(ans_text)
+            answer_texts = self._get_answer_texts(answers)
             
             if answer_texts:
                 processed_qa_pairs.append((question, answer_texts))
         
         return text, processed_qa_pairs
     
+    def _get_answer_texts(self, answers: List[Dict]) -> List[str]:
+        """提取可回答的答案文本（跳过空答案和Unanswerable）"""
+        answer_texts = []
+        
+        for ans in answers:
+            if not isinstance(ans, dict):
+                continue
+            
+            ans_text = self.extract_answer_text(ans)
+            if ans_text and ans_text != 'Unanswerable':
+                answer_texts.append(ans_text)
+        
+        return answer_texts
+    
+    def _count_qas(self, paper: Union[Paper, Dict]) -> Tuple[int, int]:
+        """统计论文的问题总数和可回答问题数（不构建论文全文）"""
+        raw_qa_pairs = self.get_questions_and_answers(paper)
+        
+        n_answerable = sum(
+            1 for _, answers in raw_qa_pairs if self._get_answer_texts(answers)
+        )
+        
+        return len(raw_qa_pairs), n_answerable
+    
     def get_paper_info(self, paper_index: int) -> Dict:
         """获取论文的基本信息"""
+        if paper_index < 0 or paper_index >= self._num_papers():
+            return {
+                'id': 'invalid_index',
+                'error': f"获取信息失败: 论文索引超出范围: {paper_index} (总数: {self._num_papers()})"
+            }
+        
+        paper = None
         try:
-            paper = self.papers[paper_index]
-            text, qa_pairs = self.prepare_for_raptor(paper_index)
+            paper = self.get_paper(paper_index)
+            
+            # 只统计长度和可回答问题数，不构建论文全文
+            text_length = self._estimate_text_length(paper)
+            _, num_questions = self._count_qas(paper)
             
             # 安全地计算段落数
             num_paragraphs = 0
-            full_text = paper.get('full_text', [])
+            full_text = paper.full_text
             for section in full_text:
                 if isinstance(section, dict):
                     paragraphs = section.get('paragraphs', [])
                     if isinstance(paragraphs, list):
                         num_paragraphs += len(paragraphs)
             
-            title = paper.get('title', 'Untitled')
-            abstract = paper.get('abstract', '')
+            title = paper.title
+            abstract = paper.abstract
             
             return {
-                'id': paper.get('id', 'unknown'),
+                'id': paper.id,
                 'title': (title[:80] + '...') if len(title) > 80 else title,
                 'abstract': (abstract[:200] + '...') if len(abstract) > 200 else abstract,
-                'text_length': len(text),
-                'text_length_readable': f"{len(text):,} 字符",
-                'num_questions': len(qa_pairs),
+                'text_length': text_length,
+                'text_length_readable': f"{text_length:,} 字符",
+                'num_questions': num_questions,
                 'num_paragraphs': num_paragraphs,
                 'num_sections': len(full_text)
             }
             
         except Exception as e:
             return {
-                'id': paper.get('id', 'unknown') if paper_index < len(self.papers) else 'invalid_index',
+                'id': paper.get('id', 'unknown') if paper is not None else 'unknown',
                 'error': f"获取信息失败: {str(e)}"
             }
     
@@ -222,13 +384,11 @@ class QasperDataProcessor:
         answerable_questions = 0
         errors = 0
         
-        for i in range(len(self.papers)):
+        for i, paper in enumerate(self.papers):
             try:
-                raw_qa = self.get_questions_and_answers(self.papers[i])
-                total_questions += len(raw_qa)
-                
-                _, qa_pairs = self.prepare_for_raptor(i)
-                answerable_questions += len(qa_pairs)
+                n_total, n_answerable = self._count_qas(paper)
+                total_questions += n_total
+                answerable_questions += n_answerable
                 
             except Exception as e:
                 errors += 1
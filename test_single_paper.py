@@ -31,7 +31,7 @@ def test_single_paper():
     # 步骤2：加载数据
     print("\n[步骤2] 加载QASPER数据...")
     processor = QasperDataProcessor("data/qasper/validation.json")
-    print(f"✓ 已加载 {len(processor.papers)} 篇论文")
+    print(f"✓ 已加载 {len(processor.paper_ids)} 篇论文")
     
     # 选择第一篇论文
     paper_idx = 0
@@ -1,31 +1,45 @@
 # verify_install_v2.py
 """改进的验证脚本"""
 
+import importlib
+
 def verify_installation():
     print("="*70)
     print("验证包安装")
     print("="*70)
     
+    # (模块名, 需要存在的属性, 成功提示；为None时打印版本号)
     packages_to_test = [
-        ('numpy', 'import numpy; print(f"  版本: {numpy.__version__}")'),
-        ('torch', 'import torch; print(f"  版本: {torch.__version__}")'),
-        ('transformers', 'import transformers; print(f"  版本: {transformers.__version__}")'),
-        ('huggingface_hub', 'import huggingface_hub; print(f"  版本: {huggingface_hub.__version__}")'),
-        ('sentence_transformers', 'import sentence_transformers; print(f"  版本: {sentence_transformers.__version__}"); from sentence_transformers import SentenceTransformer'),
-        ('openai', 'import openai; print(f"  版本: {openai.__version__}")'),
-        ('faiss', 'import faiss; print("  ✓ faiss可用")'),
-        ('datasets', 'import datasets; print(f"  版本: {datasets.__version__}")'),
-        ('tiktoken', 'import tiktoken; tiktoken.get_encoding("cl100k_base"); print("  ✓ tiktoken可用")'),
-        ('umap', 'import umap; print("  ✓ umap可用")'),
-        ('raptor', 'from raptor import RetrievalAugmentation, RetrievalAugmentationConfig; print("  ✓ raptor可导入")'),
+        ('numpy', (), None),
+        ('torch', (), None),
+        ('transformers', (), None),
+        ('huggingface_hub', (), None),
+        ('sentence_transformers', ('SentenceTransformer',), None),
+        ('openai', (), None),
+        ('faiss', (), "  ✓ faiss可用"),
+        ('datasets', (), None),
+        ('tiktoken', (), "  ✓ tiktoken可用"),
+        ('umap', (), "  ✓ umap可用"),
+        ('raptor', ('RetrievalAugmentation', 'RetrievalAugmentationConfig'), "  ✓ raptor可导入"),
     ]
     
     failed = []
     
-    for name, test_code in packages_to_test:
+    for name, attrs, message in packages_to_test:
         print(f"\n测试 {name}:")
         try:
-            exec(test_code)
+            mod = importlib.import_module(name)
+            for attr in attrs:
+                getattr(mod, attr)
+            
+            if name == 'tiktoken':
+                mod.get_encoding("cl100k_base")
+            
+            if message is None:
+                print(f"  版本: {getattr(mod, '__version__', '?')}")
+            else:
+                print(message)
+            
             print(f"  ✓ {name} 正常")
         except Exception as e:
             print(f"  ❌ {name} 失败: {e}")